@@ -1,44 +1,243 @@
 from __future__ import annotations
 
+import contextlib
+import os
+import signal
+import subprocess
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Any
 
 from tools.ast_editor import edit_file
-from tools.bash_tool import bash
-from tools.dependency import dependency_impact
-from tools.file_tools import read_file, write_file
+from tools.bash_tool import PromptFn, bash, denied_result, request_approval
+from tools.dependency import dependency_impact, graph, symbol_impact
+from tools.file_tools import overlay, read_file, write_file
+from tools.pageindex_search import pageindex
+from tools.workspace import Workspace, create_workspace
+
+
+def _empty_results() -> dict[str, Any]:
+    return {
+        "reads": [],
+        "patches": [],
+        "writes": [],
+        "dependency": [],
+        "bash": [],
+    }
+
+
+def _reindex_staged() -> None:
+    for file_path in overlay.staged_paths():
+        if file_path.endswith(".py"):
+            pageindex.update_file(file_path)
+            graph.update_file(file_path)
+
+
+class _Verification:
+    """Runs one candidate's commands in its workspace and can be killed mid-command."""
+
+    def __init__(self, cwd: str, commands: list[str], approved: dict[str, bool]) -> None:
+        self.cwd = cwd
+        self.commands = commands
+        self.approved = approved
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._process: subprocess.Popen[str] | None = None
+
+    def run(self) -> list[dict[str, Any]]:
+        outcomes = []
+        for command in self.commands:
+            if not self.approved.get(command):
+                outcomes.append(denied_result(command))
+                break
+            with self._lock:
+                if self._cancelled:
+                    break
+                # A new session lets kill() take down the whole shell pipeline.
+                self._process = subprocess.Popen(
+                    command,
+                    shell=True,
+                    text=True,
+                    cwd=self.cwd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    start_new_session=os.name == "posix",
+                )
+            stdout, stderr = self._process.communicate()
+            outcome = {
+                "ok": self._process.returncode == 0,
+                "status": "cancelled" if self._cancelled else "executed",
+                "command": command,
+                "returncode": self._process.returncode,
+                "stdout": stdout,
+                "stderr": stderr,
+            }
+            outcomes.append(outcome)
+            if not outcome["ok"]:
+                break
+        return outcomes
+
+    def kill(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            process = self._process
+            if process is None or process.poll() is not None:
+                return
+            # The group can exit between poll() and the kill.
+            with contextlib.suppress(ProcessLookupError):
+                if os.name == "posix":
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
 
 
 class ExecutorAgent:
     def execute(self, plan: dict[str, Any]) -> dict[str, Any]:
-        results: dict[str, Any] = {
-            "reads": [],
-            "patches": [],
-            "writes": [],
-            "dependency": [],
-            "bash": [],
-        }
+        results = _empty_results()
 
         for file_path in plan.get("files_to_modify", []):
             results["reads"].append(read_file(file_path))
             results["dependency"].append(dependency_impact(file_path))
 
+        for patch in plan.get("patches", []):
+            if patch.get("function_name"):
+                results["dependency"].append(symbol_impact(patch["function_name"], patch["file_path"]))
+
+        try:
+            self._apply_edits(plan, results)
+            _reindex_staged()
+            results["diff"] = overlay.diff(graph.root)
+            results["flush"] = overlay.flush()
+        finally:
+            # A successful flush has already emptied the overlay; anything left is
+            # a failed plan and must not leak into the next execute or flush.
+            overlay.discard()
+        if not results["flush"]["ok"]:
+            return {"ok": False, "error": "flush_failed", "results": results}
+
+        for command in plan.get("bash_commands", []):
+            results["bash"].append(bash(command))
+
+        return {"ok": True, "results": results}
+
+    def execute_speculative(
+        self,
+        plans: list[dict[str, Any]],
+        repo_root: str,
+        prompt_fn: PromptFn = input,
+        max_workers: int | None = None,
+    ) -> dict[str, Any]:
+        """Try every candidate plan in its own workspace and promote the first that passes.
+
+        Edits are applied serially (they are cheap), then each candidate's
+        ``bash_commands`` run in parallel, one thread per candidate driving its
+        subprocesses; once a winner is found the others are killed. Commands are
+        approved once up front, since prompting from worker threads is not possible.
+        """
+        commands = {command for plan in plans for command in plan.get("bash_commands", [])}
+        approved = {command: request_approval(command, prompt_fn) for command in sorted(commands)}
+
+        candidates: list[dict[str, Any]] = []
+        workspaces: list[Workspace] = []
+        try:
+            for index, plan in enumerate(plans):
+                workspace = create_workspace(repo_root)
+                workspaces.append(workspace)
+                results = _empty_results()
+                touched = self._apply_edits(plan, results, workspace)
+                results["flush"] = overlay.flush()
+                candidates.append(
+                    {
+                        "index": index,
+                        "workspace": workspace.kind,
+                        "applied": results["flush"]["ok"]
+                        and all(item.get("ok") for item in results["patches"] + results["writes"]),
+                        "touched": touched,
+                        "results": results,
+                    }
+                )
+
+            winner = None
+            runnable = [c["index"] for c in candidates if c["applied"]]
+            verifications = {
+                index: _Verification(
+                    str(workspaces[index].root), plans[index].get("bash_commands", []), approved
+                )
+                for index in runnable
+            }
+            workers = max_workers or max(min(len(runnable), os.cpu_count() or 1), 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = {pool.submit(verifications[index].run): index for index in runnable}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in sorted(done, key=pending.get):
+                        index = pending.pop(future)
+                        outcomes = future.result()
+                        candidates[index]["results"]["bash"] = outcomes
+                        if winner is None and all(outcome["ok"] for outcome in outcomes):
+                            winner = index
+                            for loser in pending.values():
+                                verifications[loser].kill()
+
+            promoted: dict[str, Any] = {"ok": False, "files_written": []}
+            if winner is not None:
+                workspace = workspaces[winner]
+                for rel in dict.fromkeys(candidates[winner]["touched"]):
+                    content = workspace.resolve(rel).read_text(encoding="utf-8")
+                    write_file(str(workspace.source / rel), content)
+                _reindex_staged()
+                promoted = overlay.flush()
+        finally:
+            for workspace in workspaces:
+                workspace.cleanup()
+
+        return {
+            "ok": winner is not None,
+            "winner": winner,
+            "promoted": promoted,
+            "candidates": candidates,
+        }
+
+    def _apply_edits(
+        self,
+        plan: dict[str, Any],
+        results: dict[str, Any],
+        workspace: Workspace | None = None,
+    ) -> list[str]:
+        touched: list[str] = []
+
+        def target(file_path: str, bucket: str) -> str | None:
+            if workspace is None:
+                return file_path
+            try:
+                return str(workspace.resolve(file_path))
+            except ValueError:
+                results[bucket].append({"ok": False, "error": "outside_workspace", "file_path": file_path})
+                return None
+
+        def write(file_path: str, content: str) -> None:
+            if workspace is None:
+                results["writes"].append(write_file(file_path, content))
+            else:
+                results["writes"].append(workspace.write_file(file_path, content))
+                touched.append(workspace.relative(file_path))
+
         for patch in plan.get("patches", []):
             transform = {
                 "type": "rewrite_function",
                 "function_name": patch.get("function_name"),
                 "new_body": patch.get("new_code", "pass"),
             }
-            patched = edit_file(patch["file_path"], transform)
+            file_path = target(patch["file_path"], "patches")
+            if file_path is None:
+                continue
+            patched = edit_file(file_path, transform)
             results["patches"].append(patched)
             if patched.get("ok"):
-                results["writes"].append(
-                    write_file(patch["file_path"], patched["updated_content"])
-                )
+                write(patch["file_path"], patched["updated_content"])
 
         for test_item in plan.get("tests_to_add", []):
-            results["writes"].append(write_file(test_item["file_path"], test_item["content"]))
+            if target(test_item["file_path"], "writes") is not None:
+                write(test_item["file_path"], test_item["content"])
 
-        for command in plan.get("bash_commands", []):
-            results["bash"].append(bash(command))
-
-        return {"ok": True, "results": results}
+        return touched
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import http.client
+import json
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+_ROLES = {"system": "system", "human": "user", "user": "user", "ai": "assistant", "assistant": "assistant"}
+_RETRYABLE = (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionError)
+
+
+@dataclass(slots=True)
+class ChatResponse:
+    content: str
+    raw: dict[str, Any] = field(default_factory=dict)
+
+
+def _to_ollama_message(message: Any) -> dict[str, str]:
+    if isinstance(message, dict):
+        return {"role": _ROLES[message["role"]], "content": message["content"]}
+    return {"role": _ROLES[message.type], "content": message.content}
+
+
+class OllamaChatBackend:
+    """Ollama ``/api/chat`` client with pooled keep-alive connections.
+
+    Up to ``max_connections`` HTTP/1.1 connections are reused across calls, and a
+    semaphore caps in-flight requests at ``max_in_flight`` so a batch of planner
+    calls cannot overrun the server. ``keep_alive`` is sent with every request to
+    keep the model (and its prompt cache) resident between calls.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        keep_alive: str = "30m",
+        max_connections: int = 4,
+        max_in_flight: int = 4,
+        timeout: float = 120.0,
+        options: dict[str, Any] | None = None,
+    ) -> None:
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.path_prefix = parts.path.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.options = options or {}
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(maxsize=max_connections)
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _drop_idle(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _send(
+        self, conn: http.client.HTTPConnection, path: str, body: bytes
+    ) -> tuple[int, bytes]:
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        try:
+            conn.request("POST", f"{self.path_prefix}{path}", body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        return response.status, data
+
+    def _post(self, path: str, payload: dict[str, Any]) -> dict[str, Any]:
+        body = json.dumps(payload).encode("utf-8")
+        with self._in_flight:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            try:
+                status, data = self._send(conn, path, body)
+            except _RETRYABLE:
+                if not reused:
+                    raise
+                # The server dropped an idle connection (e.g. Ollama restarted), so
+                # every pooled socket is suspect: discard them and retry fresh.
+                self._drop_idle()
+                status, data = self._send(self._connect(), path, body)
+        if status >= 400:
+            raise RuntimeError(f"Ollama returned HTTP {status}: {data[:200]!r}")
+        return json.loads(data or b"{}")
+
+    def invoke(self, messages: list[Any]) -> ChatResponse:
+        payload = {
+            "model": self.model,
+            "messages": [_to_ollama_message(message) for message in messages],
+            "stream": False,
+            "keep_alive": self.keep_alive,
+        }
+        if self.options:
+            payload["options"] = self.options
+        raw = self._post("/api/chat", payload)
+        return ChatResponse(content=raw.get("message", {}).get("content", ""), raw=raw)
+
+    def close(self) -> None:
+        self._drop_idle()
@@ -19,6 +19,7 @@ class ConversationState(TypedDict, total=False):
     conversation_summary: str
     active_bug: str
     plan: dict[str, Any]
+    candidates: list[dict[str, Any]]
     execution: dict[str, Any]
 
 
@@ -41,12 +42,18 @@ class Orchestrator:
 
     @traceable(name="planner_step")
     def _plan_node(self, state: ConversationState) -> ConversationState:
+        if settings.speculative_candidates > 1:
+            result = self.planner.plan_candidates(state["active_bug"], settings.speculative_candidates)
+            return {"plan": result["plans"][0], "candidates": result["plans"]}
         plan = self.planner.plan(state["active_bug"])
         return {"plan": plan["plan"]}
 
     @traceable(name="executor_step")
     def _execute_node(self, state: ConversationState) -> ConversationState:
-        execution = self.executor.execute(state["plan"])
+        if state.get("candidates"):
+            execution = self.executor.execute_speculative(state["candidates"], self.repo_root)
+        else:
+            execution = self.executor.execute(state["plan"])
         return {"execution": execution}
 
     def _build_graph(self):
@@ -1,45 +1,90 @@
 from __future__ import annotations
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from agents.llm_backend import OllamaChatBackend
 from agents.planner_parsing import coerce_content_to_text, parse_structured_json
 from agents.schemas import StructuredPlan
 from config import settings
+from tools.dependency import symbol_impact
 from tools.pageindex_search import semantic_search
 
 
 def _build_llm():
     if settings.llm_provider == "ollama":
-        from langchain_community.chat_models import ChatOllama
-
-        return ChatOllama(model=settings.ollama_model, base_url=settings.ollama_base_url)
+        return OllamaChatBackend(
+            base_url=settings.ollama_base_url,
+            model=settings.ollama_model,
+            keep_alive=settings.ollama_keep_alive,
+            max_connections=settings.llm_max_connections,
+            max_in_flight=settings.llm_max_in_flight,
+            timeout=settings.llm_timeout,
+        )
 
     from langchain_google_genai import ChatGoogleGenerativeAI
 
     return ChatGoogleGenerativeAI(model=settings.gemini_model, temperature=0)
 
 
+SYSTEM_PROMPT = (
+    "You are a planner agent. Return strictly JSON matching keys: "
+    "bug_summary, root_cause, files_to_modify, patches, tests_to_add, bash_commands."
+)
+
+
+def _prompt_prefix(bug_description: str, index_hits: dict[str, Any]) -> str:
+    # Byte-identical across retries and candidates (static system prompt first,
+    # compact key-sorted JSON) so server-side prompt caching can reuse it.
+    payload = json.dumps(index_hits, sort_keys=True, separators=(",", ":"))
+    return f"Bug: {bug_description}\nSearch results: {payload}"
+
+
+def _with_symbol_impact(index_hits: dict[str, Any]) -> dict[str, Any]:
+    results = []
+    for hit in index_hits.get("results", []):
+        impact = symbol_impact(hit["symbol"], hit["file_path"]) if hit["symbol"] != "<module>" else {}
+        if impact.get("ok"):
+            hit = {
+                **hit,
+                "callers": sorted({row["symbol"] for row in impact["callers"]}),
+                "tests": impact["tests"],
+            }
+        results.append(hit)
+    return {**index_hits, "results": results}
+
+
 class PlannerAgent:
     def __init__(self) -> None:
         self.llm = _build_llm()
 
     def plan(self, bug_description: str) -> dict[str, Any]:
-        index_hits = semantic_search(bug_description)
-        sys = SystemMessage(
-            content=(
-                "You are a planner agent. Return strictly JSON matching keys: "
-                "bug_summary, root_cause, files_to_modify, patches, tests_to_add, bash_commands."
-            )
-        )
-        human = HumanMessage(
-            content=f"Bug: {bug_description}\nSearch results: {json.dumps(index_hits, indent=2)}"
-        )
-        response = self.llm.invoke([sys, human])
+        index_hits = _with_symbol_impact(semantic_search(bug_description))
+        return {"ok": True, "plan": self._plan_once(_prompt_prefix(bug_description, index_hits))}
+
+    def plan_candidates(self, bug_description: str, count: int) -> dict[str, Any]:
+        index_hits = _with_symbol_impact(semantic_search(bug_description))
+        prefix = _prompt_prefix(bug_description, index_hits)
+        # The first call warms the server's prefix cache; alternatives then share it.
+        plans = [self._plan_once(prefix)]
+        hints = [
+            f"\nThis is alternative {index + 1} of {count}; propose a different fix than "
+            "the obvious one, with bash_commands that verify it."
+            for index in range(1, count)
+        ]
+        if hints:
+            workers = min(len(hints), settings.llm_max_in_flight)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                plans.extend(pool.map(lambda hint: self._plan_once(prefix, hint), hints))
+        return {"ok": True, "plans": plans}
+
+    def _plan_once(self, prefix: str, hint: str = "") -> dict[str, Any]:
+        messages = [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=prefix + hint)]
+        response = self.llm.invoke(messages)
         raw = coerce_content_to_text(response.content)
         data = parse_structured_json(raw)
         plan = StructuredPlan.model_validate(data)
-        return {"ok": True, "plan": plan.model_dump()}
-
+        return plan.model_dump()
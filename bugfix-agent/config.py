@@ -10,9 +10,15 @@ class Settings:
     gemini_model: str = os.getenv("GEMINI_MODEL", "gemini-3-flash")
     ollama_model: str = os.getenv("OLLAMA_MODEL", "gemma:2b")
     ollama_base_url: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "4"))
+    llm_max_in_flight: int = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+    llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "120"))
     langsmith_tracing: bool = os.getenv("LANGSMITH_TRACING", "false").lower() == "true"
     langsmith_project: str = os.getenv("LANGSMITH_PROJECT", "bugfix-agent")
     max_context_chars: int = int(os.getenv("MAX_CONTEXT_CHARS", "32000"))
+    query_cache_size: int = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+    speculative_candidates: int = int(os.getenv("SPECULATIVE_CANDIDATES", "1"))
 
 
 settings = Settings()
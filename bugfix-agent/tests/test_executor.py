@@ -0,0 +1,134 @@
+import time
+from pathlib import Path
+
+from agents.executor import ExecutorAgent
+from tools.file_tools import overlay
+from tools.pageindex_search import pageindex
+
+
+def _candidate(body: str) -> dict:
+    return {
+        "patches": [{"file_path": "calc.py", "function_name": "is_even", "new_code": body}],
+        "bash_commands": ["python -c 'import calc; assert calc.is_even(2)'"],
+    }
+
+
+def test_execute_indexes_unparsable_test_and_leaves_nothing_staged(tmp_path: Path):
+    (tmp_path / "calc.py").write_text("def is_even(value):\n    return True\n", encoding="utf-8")
+    pageindex.build(str(tmp_path))
+    broken = tmp_path / "test_calc.py"
+    plan = {"tests_to_add": [{"file_path": str(broken), "content": "def test_(:\n"}]}
+
+    result = ExecutorAgent().execute(plan)
+
+    assert result["ok"]
+    assert broken.read_text(encoding="utf-8") == "def test_(:\n"
+    assert overlay.staged_paths() == []
+
+
+def test_execute_discards_staged_files_when_flush_fails(tmp_path: Path):
+    (tmp_path / "calc.py").write_text("def is_even(value):\n    return True\n", encoding="utf-8")
+    plan = {
+        "tests_to_add": [
+            {"file_path": str(tmp_path / "test_ok.py"), "content": "x = 1\n"},
+            {"file_path": str(tmp_path / "calc.py" / "test_bad.py"), "content": "x = 1\n"},
+        ]
+    }
+
+    result = ExecutorAgent().execute(plan)
+
+    assert result["error"] == "flush_failed"
+    assert overlay.staged_paths() == []
+    assert not (tmp_path / "test_ok.py").exists()
+
+
+def test_speculative_execution_promotes_passing_candidate(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    source = repo / "calc.py"
+    source.write_text("def is_even(value):\n    return value % 2 == 1\n", encoding="utf-8")
+    pageindex.build(str(repo))
+    generation = pageindex.generation
+
+    result = ExecutorAgent().execute_speculative(
+        [_candidate("return False"), _candidate("return value % 2 == 0")],
+        str(repo),
+        prompt_fn=lambda _: "yes",
+    )
+
+    assert result["ok"]
+    assert result["winner"] == 1
+    assert not result["candidates"][0]["results"]["bash"][0]["ok"]
+    assert "value % 2 == 0" in source.read_text(encoding="utf-8")
+    assert [p.name for p in tmp_path.iterdir()] == ["repo"]
+    assert pageindex.generation > generation
+
+
+def test_speculative_execution_leaves_tree_untouched_when_all_fail(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    source = repo / "calc.py"
+    original = "def is_even(value):\n    return value % 2 == 1\n"
+    source.write_text(original, encoding="utf-8")
+
+    result = ExecutorAgent().execute_speculative(
+        [_candidate("return False")], str(repo), prompt_fn=lambda _: "no"
+    )
+
+    assert not result["ok"]
+    assert result["candidates"][0]["results"]["bash"][0]["status"] == "denied"
+    assert source.read_text(encoding="utf-8") == original
+
+
+def test_speculative_candidate_with_failed_flush_is_not_verified(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "calc.py").write_text("def is_even(value):\n    return value % 2 == 1\n", encoding="utf-8")
+    candidate = _candidate("return value % 2 == 0")
+    candidate["tests_to_add"] = [{"file_path": "calc.py/test_calc.py", "content": "x = 1\n"}]
+    candidate["bash_commands"] = ["true"]
+
+    result = ExecutorAgent().execute_speculative([candidate], str(repo), prompt_fn=lambda _: "yes")
+
+    assert not result["ok"]
+    assert not result["candidates"][0]["applied"]
+    assert result["candidates"][0]["results"]["bash"] == []
+
+
+def test_speculative_verification_cannot_write_through_to_source(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "calc.py").write_text("def is_even(value):\n    return value % 2 == 1\n", encoding="utf-8")
+    data = repo / "data.txt"
+    data.write_text("orig\n", encoding="utf-8")
+    outside = tmp_path / "outside.py"
+    outside.write_text("def is_even(value):\n    return True\n", encoding="utf-8")
+    scribbler = _candidate("return False")
+    scribbler["bash_commands"] = ["echo scribble >> data.txt; false"]
+    escaper = _candidate("return False")
+    escaper["patches"][0]["file_path"] = str(outside)
+
+    result = ExecutorAgent().execute_speculative(
+        [scribbler, escaper], str(repo), prompt_fn=lambda _: "yes"
+    )
+
+    assert not result["ok"]
+    assert data.read_text(encoding="utf-8") == "orig\n"
+    assert result["candidates"][1]["results"]["patches"][0]["error"] == "outside_workspace"
+    assert outside.read_text(encoding="utf-8") == "def is_even(value):\n    return True\n"
+
+
+def test_speculative_execution_kills_slower_candidates_once_one_passes(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "calc.py").write_text("def is_even(value):\n    return value % 2 == 1\n", encoding="utf-8")
+    fast = _candidate("return value % 2 == 0")
+    slow = _candidate("return value % 2 == 0")
+    slow["bash_commands"] = ["sleep 5; false"]
+
+    started = time.monotonic()
+    result = ExecutorAgent().execute_speculative([fast, slow], str(repo), prompt_fn=lambda _: "yes")
+
+    assert result["winner"] == 0
+    assert time.monotonic() - started < 4
+    assert result["candidates"][1]["results"]["bash"][0]["status"] == "cancelled"
@@ -0,0 +1,119 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agents.llm_backend import OllamaChatBackend
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.sockets.append(self.connection)
+
+    def do_POST(self):
+        started = time.monotonic()
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.active -= 1
+        self.server.requests.append(
+            {"client": self.client_address, "body": body, "start": started, "end": time.monotonic()}
+        )
+        payload = json.dumps({"message": {"role": "assistant", "content": "{}"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    server.requests, server.lock, server.active, server.peak = [], threading.Lock(), 0, 0
+    server.delay, server.sockets = 0.0, []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_backend_reuses_keep_alive_connection(stub_server):
+    backend = OllamaChatBackend(f"http://127.0.0.1:{stub_server.server_port}", "gemma:2b", keep_alive="10m")
+    messages = [{"role": "system", "content": "sys"}, {"role": "human", "content": "bug"}]
+
+    for _ in range(3):
+        assert backend.invoke(messages).content == "{}"
+
+    assert len({request["client"] for request in stub_server.requests}) == 1
+    body = stub_server.requests[0]["body"]
+    assert body["keep_alive"] == "10m"
+    assert body["stream"] is False
+    assert [m["role"] for m in body["messages"]] == ["system", "user"]
+    backend.close()
+
+
+def test_backend_bounds_in_flight_requests(stub_server):
+    stub_server.delay = 0.05
+    backend = OllamaChatBackend(
+        f"http://127.0.0.1:{stub_server.server_port}", "gemma:2b", max_connections=2, max_in_flight=2
+    )
+    threads = [
+        threading.Thread(target=backend.invoke, args=([{"role": "user", "content": "x"}],))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stub_server.requests) == 6
+    assert stub_server.peak <= 2
+    events = sorted(
+        [(r["start"], 1) for r in stub_server.requests] + [(r["end"], -1) for r in stub_server.requests],
+        key=lambda event: (event[0], event[1]),
+    )
+    overlap = peak = 0
+    for _, delta in events:
+        overlap += delta
+        peak = max(peak, overlap)
+    assert peak <= 2
+    assert len({request["client"] for request in stub_server.requests}) == 2
+    backend.close()
+
+
+def test_backend_recovers_when_every_pooled_connection_is_stale(stub_server):
+    stub_server.delay = 0.05
+    backend = OllamaChatBackend(
+        f"http://127.0.0.1:{stub_server.server_port}", "gemma:2b", max_connections=2, max_in_flight=2
+    )
+    messages = [{"role": "user", "content": "x"}]
+    threads = [threading.Thread(target=backend.invoke, args=(messages,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend._idle.qsize() == 2
+
+    # Simulate an Ollama restart: the server side of every pooled socket goes away.
+    for sock in stub_server.sockets:
+        sock.shutdown(socket.SHUT_RDWR)
+    time.sleep(0.05)
+    stub_server.delay = 0.0
+
+    assert backend.invoke(messages).content == "{}"
+    assert backend._idle.qsize() <= 1
+    backend.close()
@@ -1,9 +1,11 @@
+import json
+import os
 from pathlib import Path
 
 from tools.ast_editor import edit_file
 from tools.bash_tool import bash
-from tools.dependency import graph
-from tools.file_tools import read_file, write_file
+from tools.dependency import graph, symbol_impact
+from tools.file_tools import overlay, read_file, rollback, write_file
 from tools.pageindex_search import pageindex, semantic_search
 
 
@@ -15,6 +17,69 @@ def test_file_tools_roundtrip(tmp_path: Path):
     assert read["content"] == "value = 1\n"
 
 
+def test_staged_writes_are_visible_before_flush(tmp_path: Path):
+    overlay.discard()
+    (tmp_path / "b.py").write_text("def hello():\n    return 'ok'\n", encoding="utf-8")
+    graph.build(str(tmp_path))
+    write_file(str(tmp_path / "a.py"), "from b import hello\n")
+
+    assert not (tmp_path / "a.py").exists()
+    diff = overlay.diff(tmp_path)
+    assert "+++ b/a.py" in diff
+    assert "+from b import hello" in diff
+    graph.update_file(str(tmp_path / "a.py"))
+    assert graph.get_dependents("b.py") == ["a.py"]
+
+    flushed = overlay.flush()
+    assert flushed["ok"]
+    assert (tmp_path / "a.py").read_text(encoding="utf-8") == "from b import hello\n"
+    assert not overlay.staged_paths()
+
+
+def test_failed_flush_restores_files_already_written(tmp_path: Path):
+    overlay.discard()
+    first = tmp_path / "a.py"
+    first.write_text("value = 1\n", encoding="utf-8")
+    write_file(str(first), "value = 2\n")
+    assert write_file(str(tmp_path / "b.py"), "value = '\udc80'\n")["error"] == "invalid_content"
+    overlay.stage(tmp_path / "b.py", "value = '\udc80'\n")
+
+    flushed = overlay.flush()
+
+    assert flushed["error"] == "flush_failed"
+    assert first.read_text(encoding="utf-8") == "value = 1\n"
+    assert not (tmp_path / "b.py").exists()
+    assert overlay.staged_paths() == []
+
+
+def test_flush_preserves_file_mode(tmp_path: Path):
+    script = tmp_path / "run.py"
+    script.write_text("print(1)\n", encoding="utf-8")
+    script.chmod(0o755)
+    write_file(str(script), "print(2)\n")
+    write_file(str(tmp_path / "new.py"), "x = 1\n")
+
+    assert overlay.flush()["ok"]
+    assert script.stat().st_mode & 0o777 == 0o755
+    umask = os.umask(0)
+    os.umask(umask)
+    assert (tmp_path / "new.py").stat().st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_rollback_restores_files_from_journal(tmp_path: Path):
+    target = tmp_path / "x.py"
+    target.write_text("value = 1\n", encoding="utf-8")
+    journal = tmp_path / "journal.json"
+    journal.write_text(json.dumps({str(target): "value = 1\n", str(tmp_path / "new.py"): None}))
+    target.write_text("value = 2\n", encoding="utf-8")
+    (tmp_path / "new.py").write_text("x = 1\n", encoding="utf-8")
+
+    assert rollback(str(journal))["ok"]
+    assert target.read_text(encoding="utf-8") == "value = 1\n"
+    assert not (tmp_path / "new.py").exists()
+    assert not journal.exists()
+
+
 def test_ast_edit_generates_diff(tmp_path: Path):
     p = tmp_path / "mod.py"
     p.write_text("def foo():\n    return 1\n", encoding="utf-8")
@@ -26,6 +91,75 @@ def test_ast_edit_generates_diff(tmp_path: Path):
     assert "--- a/" in result["diff"]
 
 
+def test_ast_edit_targets_qualified_name_and_splices_only_its_body(tmp_path: Path):
+    p = tmp_path / "mod.py"
+    p.write_text(
+        "class A:\n    def run(self):\n        return 1\n\n"
+        "class B:\n    def run(self): return 1\n",
+        encoding="utf-8",
+    )
+    ambiguous = edit_file(
+        str(p), {"type": "rewrite_function", "function_name": "run", "new_body": "return 2"}
+    )
+    assert ambiguous["error"] == "ambiguous_function"
+    assert ambiguous["candidates"] == ["A.run", "B.run"]
+
+    result = edit_file(
+        str(p), {"type": "rewrite_function", "function_name": "B.run", "new_body": "return 2"}
+    )
+    assert result["ok"]
+    assert result["updated_content"] == (
+        "class A:\n    def run(self):\n        return 1\n\n"
+        "class B:\n    def run(self):\n        return 2\n"
+    )
+    assert "@@ -3,4 +3,5 @@" in result["diff"]
+
+
+def test_ast_edit_finds_nested_defs_and_rejects_duplicate_qualnames(tmp_path: Path):
+    p = tmp_path / "mod.py"
+    p.write_text(
+        "import sys\n\nif sys.version_info >= (3,):\n    def foo():\n        return 1\n\n"
+        "try:\n    def bar():\n        return 1\nexcept ImportError:\n    pass\n\n"
+        "class C:\n    @property\n    def v(self):\n        return 1\n\n"
+        "    @v.setter\n    def v(self, value):\n        pass\n",
+        encoding="utf-8",
+    )
+    for name in ("foo", "bar"):
+        result = edit_file(
+            str(p), {"type": "rewrite_function", "function_name": name, "new_body": "return 2"}
+        )
+        assert result["ok"], result
+
+    duplicate = edit_file(
+        str(p), {"type": "rewrite_function", "function_name": "C.v", "new_body": "return 2"}
+    )
+    assert duplicate["error"] == "ambiguous_function"
+    assert duplicate["candidates"] == ["C.v"]
+    assert duplicate["lines"] == [15, 19]
+
+
+def test_ast_edit_leaves_multiline_string_contents_unindented(tmp_path: Path):
+    p = tmp_path / "m.py"
+    p.write_text("class C:\n    def f(self):\n        return ''\n", encoding="utf-8")
+    body = 's = """\nxyz\n  \n"""\nt = f"""{s}\nend"""\nreturn s + t'
+
+    result = edit_file(str(p), {"type": "rewrite_function", "function_name": "C.f", "new_body": body})
+
+    assert result["ok"], result
+    namespace: dict = {}
+    exec(result["updated_content"], namespace)
+    assert namespace["C"]().f() == "\nxyz\n  \n" + "\nxyz\n  \n\nend"
+
+
+def test_ast_edit_rejects_body_that_does_not_parse(tmp_path: Path):
+    p = tmp_path / "mod.py"
+    p.write_text("def foo():\n    return 1\n", encoding="utf-8")
+    result = edit_file(
+        str(p), {"type": "rewrite_function", "function_name": "foo", "new_body": "return ("}
+    )
+    assert result["error"] == "syntax_error"
+
+
 def test_bash_requires_approval():
     denied = bash("echo hi", prompt_fn=lambda _: "no")
     assert denied["status"] == "denied"
@@ -45,3 +179,92 @@ def test_pageindex_and_dependency(tmp_path: Path):
     graph.build(str(tmp_path))
     dependents = graph.get_dependents("b.py")
     assert "a.py" in dependents
+
+
+def test_symbol_index_resolves_callers_and_reaching_tests(tmp_path: Path):
+    pkg = tmp_path / "pkg"
+    (tmp_path / "tests").mkdir()
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("from .util import slug\n", encoding="utf-8")
+    (pkg / "util.py").write_text(
+        "def slug(text):\n    return text.lower()\n\ndef other():\n    return 1\n",
+        encoding="utf-8",
+    )
+    (pkg / "views.py").write_text(
+        "from pkg import slug\nfrom pkg import util\n\n"
+        "class View:\n"
+        "    def title(self):\n        return slug('X')\n\n"
+        "    def render(self):\n        return self.title() + str(util.other())\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "tests" / "test_views.py").write_text(
+        "from pkg.views import View\n\ndef test_render():\n    assert View().render()\n",
+        encoding="utf-8",
+    )
+    graph.build(str(tmp_path))
+
+    impact = symbol_impact("slug", "pkg/util.py")
+    assert impact["definition"] == {"symbol": "pkg.util.slug", "file_path": "pkg/util.py", "line": 1}
+    assert [(row["symbol"], row["line"]) for row in impact["callers"]] == [("pkg.views.View.title", 6)]
+    assert impact["tests"] == ["tests.test_views.test_render"]
+    assert [row["symbol"] for row in graph.symbols.callers("pkg.util.other")] == ["pkg.views.View.render"]
+    assert graph.symbols.callers("pkg.views.View.title")[0]["symbol"] == "pkg.views.View.render"
+
+
+def test_symbol_index_resolves_methods_called_through_module_singletons(tmp_path: Path):
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "engine.py").write_text(
+        "class Engine:\n    def run(self):\n        return 1\n\n"
+        "engine = Engine()\n\ndef helper():\n    return engine.run()\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "tests" / "test_engine.py").write_text(
+        "from engine import engine\n\ndef test_run():\n    assert engine.run()\n",
+        encoding="utf-8",
+    )
+    graph.build(str(tmp_path))
+
+    impact = symbol_impact("Engine.run", "engine.py")
+    assert [row["symbol"] for row in impact["callers"]] == ["engine.helper", "tests.test_engine.test_run"]
+    assert impact["tests"] == ["tests.test_engine.test_run"]
+
+
+def test_pageindex_query_cache_is_tied_to_index_generation(tmp_path: Path):
+    source = tmp_path / "a.py"
+    source.write_text("def hello():\n    return 'ok'\n", encoding="utf-8")
+    pageindex.build(str(tmp_path))
+    before = pageindex.cache_info()
+
+    first = pageindex.query("hello")
+    again = pageindex.query("  HELLO ")
+    assert again["results"] == first["results"]
+    assert first["results"][0]["snippet"] == "def hello():\n    return 'ok'"
+    info = pageindex.cache_info()
+    assert info["misses"] == before["misses"] + 1
+    assert info["hits"] == before["hits"] + 1
+
+    source.write_text("def hello():\n    return 'changed'\n", encoding="utf-8")
+    pageindex.update_file("a.py")
+    assert pageindex.cache_info()["generation"] == before["generation"] + 1
+    assert "changed" in pageindex.query("hello")["results"][0]["snippet"]
+
+
+def test_symbol_index_tracks_updates_and_absolute_paths(tmp_path: Path):
+    overlay.discard()
+    (tmp_path / "util.py").write_text("def helper():\n    return 1\n", encoding="utf-8")
+    caller = tmp_path / "app.py"
+    caller.write_text("from util import helper\n\ndef run():\n    return helper()\n", encoding="utf-8")
+    graph.build(str(tmp_path))
+    graph.symbols._rebuild()
+
+    absolute = symbol_impact("helper", str(tmp_path / "util.py"))
+    assert [row["symbol"] for row in absolute["callers"]] == ["app.run"]
+    assert symbol_impact("helper", "/elsewhere/util.py")["error"] == "outside_graph"
+
+    caller.write_text("from util import helper\n\ndef main():\n    return helper()\n", encoding="utf-8")
+    graph.update_file("app.py")
+    assert [row["symbol"] for row in graph.symbols.callers("util.helper")] == ["app.main"]
+
+    caller.write_text("def broken(:\n", encoding="utf-8")
+    graph.update_file("app.py")
+    assert graph.symbols.callers("util.helper") == []
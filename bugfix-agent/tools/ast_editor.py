@@ -1,39 +1,166 @@
 from __future__ import annotations
 
+import ast
 import difflib
-import importlib
-import importlib.util
+import hashlib
+import io
+import os
+import re
+import tokenize
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-HAS_LIBCST = importlib.util.find_spec("libcst") is not None
-if HAS_LIBCST:
-    cst = importlib.import_module("libcst")
+from tools.file_tools import overlay
 
+DIFF_CONTEXT = 3
+_HUNK_RE = re.compile(r"^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
+# f-strings tokenize as START/MIDDLE/END from 3.12 on.
+_FSTRING_START = getattr(tokenize, "FSTRING_START", None)
+_FSTRING_END = getattr(tokenize, "FSTRING_END", None)
 
-def _fallback_rewrite(before: str, function_name: str, new_body: str) -> tuple[bool, str]:
-    lines = before.splitlines()
-    target = f"def {function_name}("
-    for idx, line in enumerate(lines):
-        if line.lstrip().startswith(target):
-            indent = " " * (len(line) - len(line.lstrip()) + 4)
-            body_lines = [f"{indent}{segment}" for segment in new_body.splitlines() if segment.strip()]
-            if not body_lines:
-                body_lines = [f"{indent}pass"]
-            end = idx + 1
-            while end < len(lines) and (lines[end].startswith(indent) or not lines[end].strip()):
-                end += 1
-            updated = lines[: idx + 1] + body_lines + lines[end:]
-            return True, "\n".join(updated) + "\n"
-    return False, before
+
+@dataclass(slots=True)
+class FunctionSpan:
+    qualname: str
+    def_line: int
+    body_line: int
+    body_col: int
+    end_line: int
+    end_col: int
+
+
+@dataclass(slots=True)
+class FileLayout:
+    digest: bytes
+    spans: dict[str, list[FunctionSpan]]
+    line_offsets: list[int]
+
+
+LAYOUT_CACHE_SIZE = 64
+_layout_cache: OrderedDict[str, FileLayout] = OrderedDict()
+
+
+def _collect_spans(tree: ast.Module) -> dict[str, list[FunctionSpan]]:
+    spans: dict[str, list[FunctionSpan]] = {}
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        # Defs can sit under if/try/with/else blocks; only defs and classes add a scope.
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                qualname = f"{prefix}{child.name}"
+                first, last = child.body[0], child.body[-1]
+                spans.setdefault(qualname, []).append(
+                    FunctionSpan(
+                        qualname,
+                        child.lineno,
+                        first.lineno,
+                        first.col_offset,
+                        last.end_lineno or last.lineno,
+                        last.end_col_offset or 0,
+                    )
+                )
+                visit(child, f"{qualname}.")
+            elif isinstance(child, ast.ClassDef):
+                visit(child, f"{prefix}{child.name}.")
+            else:
+                visit(child, prefix)
+
+    visit(tree, "")
+    return spans
+
+
+def file_layout(path: Path, source: bytes) -> FileLayout:
+    """Return function spans and line byte offsets, cached per file content."""
+    key = str(path.resolve())
+    digest = hashlib.blake2b(source, digest_size=16).digest()
+    cached = _layout_cache.get(key)
+    if cached and cached.digest == digest:
+        _layout_cache.move_to_end(key)
+        return cached
+    spans = _collect_spans(ast.parse(source))
+    offsets = [0, 0] + [match.end() for match in re.finditer(b"\n", source)]
+    layout = FileLayout(digest, spans, offsets)
+    _layout_cache[key] = layout
+    _layout_cache.move_to_end(key)
+    if len(_layout_cache) > LAYOUT_CACHE_SIZE:
+        _layout_cache.popitem(last=False)
+    return layout
+
+
+def _find_span(
+    spans: dict[str, list[FunctionSpan]], function_name: str
+) -> FunctionSpan | list[FunctionSpan]:
+    """Return the single matching span, or every match (empty when none)."""
+    matches = spans.get(function_name) or [
+        span
+        for name, group in spans.items()
+        if name.rsplit(".", 1)[-1] == function_name
+        for span in group
+    ]
+    return matches[0] if len(matches) == 1 else matches
+
+
+def _string_continuation_rows(source: str) -> set[int]:
+    """1-based rows that continue a string literal opened on an earlier row."""
+    rows: set[int] = set()
+    fstring_rows: list[int] = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type == tokenize.STRING:
+                rows.update(range(token.start[0] + 1, token.end[0] + 1))
+            elif token.type == _FSTRING_START:
+                fstring_rows.append(token.start[0])
+            elif token.type == _FSTRING_END:
+                rows.update(range(fstring_rows.pop() + 1, token.end[0] + 1))
+    except (tokenize.TokenError, SyntaxError):
+        pass  # edit_file reports the syntax error once the body is spliced in
+    return rows
+
+
+def _render_body(new_body: str, indent: str) -> str:
+    # Re-indent statement lines only; lines continuing a string literal are content.
+    lines = new_body.splitlines()
+    inside = _string_continuation_rows(new_body)
+    code = [line for row, line in enumerate(lines, 1) if row not in inside and line.strip()]
+    margin = os.path.commonprefix([line[: len(line) - len(line.lstrip())] for line in code])
+    rendered = [
+        line if row in inside else f"{indent}{line[len(margin):]}" if line.strip() else ""
+        for row, line in enumerate(lines, 1)
+    ]
+    return "\n".join(rendered).strip("\n") or f"{indent}pass"
+
+
+def _hunk_diff(
+    file_path: str, before: list[str], after: list[str], first_line: int
+) -> str:
+    lines = []
+    for line in difflib.unified_diff(
+        before, after, fromfile=f"a/{file_path}", tofile=f"b/{file_path}", lineterm=""
+    ):
+        match = _HUNK_RE.match(line)
+        if match:
+            old_start = int(match.group(1)) + first_line - 1
+            new_start = int(match.group(3)) + first_line - 1
+            line = (
+                f"@@ -{old_start}{match.group(2) or ''} "
+                f"+{new_start}{match.group(4) or ''} @@{line[match.end():]}"
+            )
+        lines.append(line)
+    return "\n".join(lines)
 
 
 def edit_file(file_path: str, ast_transform: dict[str, Any]) -> dict[str, Any]:
+    """Rewrite one function body by splicing only its byte range.
+
+    ``function_name`` may be qualified (``Class.method``, ``outer.inner``); a bare
+    name is accepted when it identifies exactly one function in the file.
+    """
     path = Path(file_path)
-    if not path.exists():
+    if not overlay.exists(path):
         return {"ok": False, "error": "file_not_found", "file_path": file_path}
 
-    before = path.read_text(encoding="utf-8")
     transform_type = ast_transform.get("type")
     if transform_type != "rewrite_function":
         return {"ok": False, "error": "unsupported_transform", "transform": ast_transform}
@@ -41,29 +168,25 @@ def edit_file(file_path: str, ast_transform: dict[str, Any]) -> dict[str, Any]:
     function_name = ast_transform["function_name"]
     new_body = ast_transform["new_body"]
 
-    if HAS_LIBCST:
-        class FunctionRewriter(cst.CSTTransformer):
-            def __init__(self, function_name: str, new_body: str) -> None:
-                self.function_name = function_name
-                self.replaced = False
-                body_module = cst.parse_module(new_body)
-                self.new_statements = body_module.body
-
-            def leave_FunctionDef(self, original_node, updated_node):
-                if original_node.name.value != self.function_name:
-                    return updated_node
-                self.replaced = True
-                indented = cst.IndentedBlock(body=self.new_statements)
-                return updated_node.with_changes(body=indented)
-
-        module = cst.parse_module(before)
-        rewriter = FunctionRewriter(function_name=function_name, new_body=new_body)
-        after = module.visit(rewriter).code
-        replaced = rewriter.replaced
-    else:
-        replaced, after = _fallback_rewrite(before, function_name, new_body)
+    source = overlay.read_text(path).encode("utf-8")
+    try:
+        layout = file_layout(path, source)
+    except SyntaxError as exc:
+        return {"ok": False, "error": "syntax_error", "file_path": file_path, "message": str(exc)}
 
-    if not replaced:
+    span = _find_span(layout.spans, function_name) if function_name else []
+    if isinstance(span, list) and span:
+        # Covers same-named functions in different scopes as well as duplicate
+        # qualified names (property getter/setter, @overload stubs, redefinitions).
+        return {
+            "ok": False,
+            "error": "ambiguous_function",
+            "file_path": file_path,
+            "function_name": function_name,
+            "candidates": list(dict.fromkeys(match.qualname for match in span)),
+            "lines": [match.def_line for match in span],
+        }
+    if not span:
         return {
             "ok": False,
             "error": "function_not_found",
@@ -71,21 +194,51 @@ def edit_file(file_path: str, ast_transform: dict[str, Any]) -> dict[str, Any]:
             "function_name": function_name,
         }
 
-    diff = "\n".join(
-        difflib.unified_diff(
-            before.splitlines(),
-            after.splitlines(),
-            fromfile=f"a/{file_path}",
-            tofile=f"b/{file_path}",
-            lineterm="",
-        )
-    )
+    offsets = layout.line_offsets
+    start = offsets[span.body_line] + span.body_col
+    end = offsets[span.end_line] + span.end_col
+    def_start = offsets[span.def_line]
+    indent = source[offsets[span.body_line] : start].decode("utf-8")
+    if indent.strip():
+        # Body shares the ``def`` line, e.g. ``def f(): return 1``.
+        start = def_start + len(source[def_start:start].rstrip())
+        header = source[def_start:start].decode("utf-8")
+        indent = header[: len(header) - len(header.lstrip())] + "    "
+        replacement = "\n" + _render_body(new_body, indent)
+    else:
+        replacement = _render_body(new_body, indent)[len(indent) :]
+
+    edited = replacement.encode("utf-8")
+    region_after = (source[def_start:start] + edited).decode("utf-8")
+    # Strip only the def's own margin: string continuation lines may sit left of it.
+    margin = region_after[: len(region_after) - len(region_after.lstrip(" \t"))]
+    try:
+        ast.parse("\n".join(line.removeprefix(margin) for line in region_after.split("\n")))
+    except SyntaxError as exc:
+        return {
+            "ok": False,
+            "error": "syntax_error",
+            "file_path": file_path,
+            "function_name": span.qualname,
+            "message": str(exc),
+        }
+
+    after_bytes = source[:start] + edited + source[end:]
+    after = after_bytes.decode("utf-8")
+
+    first_line = max(1, span.def_line - DIFF_CONTEXT)
+    hunk_start = offsets[first_line]
+    tail = source[end:].split(b"\n", DIFF_CONTEXT + 1)
+    trailing = b"\n".join(tail[: DIFF_CONTEXT + 1])
+    before_hunk = (source[hunk_start:end] + trailing).decode("utf-8").splitlines()
+    after_hunk = (source[hunk_start:start] + edited + trailing).decode("utf-8").splitlines()
+
     return {
         "ok": True,
         "file_path": file_path,
-        "function_name": function_name,
+        "function_name": span.qualname,
         "change_type": "update",
-        "diff": diff,
+        "diff": _hunk_diff(file_path, before_hunk, after_hunk, first_line),
         "updated_content": after,
-        "engine": "libcst" if HAS_LIBCST else "fallback",
+        "engine": "splice",
     }
@@ -7,17 +7,22 @@ from typing import Any, Callable
 PromptFn = Callable[[str], str]
 
 
-def bash(command: str, prompt_fn: PromptFn = input) -> dict[str, Any]:
+def request_approval(command: str, prompt_fn: PromptFn = input) -> bool:
     approval = prompt_fn(f"Run bash command '{command}'? Type yes to continue: ").strip().lower()
-    if approval != "yes":
-        return {
-            "ok": False,
-            "status": "denied",
-            "command": command,
-            "message": "Command not executed; user denied permission.",
-        }
-
-    completed = subprocess.run(command, shell=True, text=True, capture_output=True)
+    return approval == "yes"
+
+
+def denied_result(command: str) -> dict[str, Any]:
+    return {
+        "ok": False,
+        "status": "denied",
+        "command": command,
+        "message": "Command not executed; user denied permission.",
+    }
+
+
+def run_command(command: str, cwd: str | None = None) -> dict[str, Any]:
+    completed = subprocess.run(command, shell=True, text=True, capture_output=True, cwd=cwd)
     return {
         "ok": completed.returncode == 0,
         "status": "executed",
@@ -26,3 +31,9 @@ def bash(command: str, prompt_fn: PromptFn = input) -> dict[str, Any]:
         "stdout": completed.stdout,
         "stderr": completed.stderr,
     }
+
+
+def bash(command: str, prompt_fn: PromptFn = input) -> dict[str, Any]:
+    if not request_approval(command, prompt_fn):
+        return denied_result(command)
+    return run_command(command)
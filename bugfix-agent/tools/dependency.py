@@ -6,6 +6,9 @@ import importlib.util
 from pathlib import Path
 from typing import Any
 
+from tools.file_tools import overlay
+from tools.symbols import SymbolIndex, module_name
+
 HAS_NETWORKX = importlib.util.find_spec("networkx") is not None
 if HAS_NETWORKX:
     nx = importlib.import_module("networkx")
@@ -16,39 +19,68 @@ class DependencyGraph:
         self.edges: dict[str, set[str]] = {}
         self.reverse: dict[str, set[str]] = {}
         self.graph = nx.DiGraph() if HAS_NETWORKX else None
+        self.root: Path | None = None
+        self.symbols = SymbolIndex()
 
     def build(self, repo_root: str) -> dict[str, Any]:
         root = Path(repo_root)
+        self.root = root
         self.edges.clear()
         self.reverse.clear()
+        self.symbols.clear()
         if HAS_NETWORKX and self.graph is not None:
             self.graph.clear()
 
-        for path in root.rglob("*.py"):
-            if ".git" in path.parts or "__pycache__" in path.parts:
-                continue
-            rel = str(path.relative_to(root))
-            self.edges.setdefault(rel, set())
-            self.reverse.setdefault(rel, set())
-            if HAS_NETWORKX and self.graph is not None:
-                self.graph.add_node(rel)
-            text = path.read_text(encoding="utf-8")
-            try:
-                tree = ast.parse(text)
-            except SyntaxError:
-                continue
-            for node in ast.walk(tree):
-                target = None
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        target = f"{alias.name.replace('.', '/')}.py"
-                        self._add_edge(rel, target)
-                elif isinstance(node, ast.ImportFrom) and node.module:
-                    target = f"{node.module.replace('.', '/')}.py"
-                    self._add_edge(rel, target)
+        for path in overlay.python_files(root):
+            self._index_file(str(path.relative_to(root)), overlay.read_text(path))
 
         edge_count = sum(len(v) for v in self.edges.values())
-        return {"ok": True, "nodes": len(self.edges), "edges": edge_count}
+        return {"ok": True, "nodes": len(self.edges), "edges": edge_count, "symbols": self.symbols.stats()}
+
+    def update_file(self, file_path: str) -> dict[str, Any]:
+        """Re-index one file's imports (e.g. after a staged edit) without a full rebuild."""
+        if self.root is None:
+            return {"ok": False, "error": "graph_not_built", "file_path": file_path}
+        rel = self.relative_path(file_path)
+        if rel is None:
+            return {"ok": False, "error": "outside_graph", "file_path": file_path}
+        for target in self.edges.get(rel, set()):
+            self.reverse.get(target, set()).discard(rel)
+            if HAS_NETWORKX and self.graph is not None:
+                self.graph.remove_edge(rel, target)
+        self.edges[rel] = set()
+        self._index_file(rel, overlay.read_text(self.root / rel))
+        return {"ok": True, "file_path": rel, "imports": sorted(self.edges[rel])}
+
+    def relative_path(self, file_path: str) -> str | None:
+        """Repo-relative form of ``file_path`` (relative paths are taken as repo-relative)."""
+        if self.root is None:
+            return None
+        path = Path(file_path)
+        if not path.is_absolute():
+            path = self.root / path
+        try:
+            return str(path.resolve().relative_to(self.root.resolve()))
+        except ValueError:
+            return None
+
+    def _index_file(self, rel: str, text: str) -> None:
+        self.edges.setdefault(rel, set())
+        self.reverse.setdefault(rel, set())
+        if HAS_NETWORKX and self.graph is not None:
+            self.graph.add_node(rel)
+        try:
+            tree = ast.parse(text)
+        except SyntaxError:
+            self.symbols.remove_module(rel)
+            return
+        self.symbols.index_module(rel, tree)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    self._add_edge(rel, f"{alias.name.replace('.', '/')}.py")
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                self._add_edge(rel, f"{node.module.replace('.', '/')}.py")
 
     def _add_edge(self, source: str, target: str) -> None:
         self.edges.setdefault(source, set()).add(target)
@@ -77,3 +109,20 @@ graph = DependencyGraph()
 def dependency_impact(file_path: str) -> dict[str, Any]:
     dependents = graph.get_dependents(file_path)
     return {"ok": True, "file_path": file_path, "dependents": dependents}
+
+
+def symbol_impact(symbol: str, file_path: str | None = None) -> dict[str, Any]:
+    """Callers and reaching tests for ``symbol``, qualified by ``file_path`` if given."""
+    if file_path:
+        rel = graph.relative_path(file_path)
+        if rel is None:
+            error = "graph_not_built" if graph.root is None else "outside_graph"
+            return {"ok": False, "error": error, "symbol": symbol, "file_path": file_path}
+        symbol = f"{module_name(rel)}.{symbol}"
+    return {
+        "ok": True,
+        "symbol": symbol,
+        "definition": graph.symbols.definition(symbol),
+        "callers": graph.symbols.callers(symbol),
+        "tests": graph.symbols.tests_reaching(symbol),
+    }
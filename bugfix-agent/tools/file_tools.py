@@ -1,23 +1,184 @@
 from __future__ import annotations
 
+import difflib
+import json
+import os
+import stat
+import tempfile
 from pathlib import Path
 from typing import Any
 
+SKIPPED_DIRS = {".git", "__pycache__"}
+
+
+def _file_mode(path: Path) -> int:
+    if path.exists():
+        return stat.S_IMODE(path.stat().st_mode)
+    # mkstemp always creates 0600; new files get what open() would have given them.
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(content)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(tmp, _file_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class StagingOverlay:
+    """In-memory layer of pending writes that file tools and indexers read through.
+
+    Nothing touches disk until :meth:`flush`, which replaces each file with an
+    atomic rename and can keep a JSON rollback journal while it runs.
+    """
+
+    def __init__(self) -> None:
+        self._staged: dict[str, str] = {}
+
+    @staticmethod
+    def _key(file_path: str | Path) -> str:
+        return str(Path(file_path).resolve())
+
+    def stage(self, file_path: str | Path, content: str) -> None:
+        self._staged[self._key(file_path)] = content
+
+    def is_staged(self, file_path: str | Path) -> bool:
+        return self._key(file_path) in self._staged
+
+    def exists(self, file_path: str | Path) -> bool:
+        return self.is_staged(file_path) or Path(file_path).exists()
+
+    def read_text(self, file_path: str | Path) -> str:
+        staged = self._staged.get(self._key(file_path))
+        if staged is not None:
+            return staged
+        return Path(file_path).read_text(encoding="utf-8")
+
+    def staged_paths(self) -> list[str]:
+        return sorted(self._staged)
+
+    def python_files(self, root: Path) -> list[Path]:
+        files = {
+            path.resolve(): path
+            for path in root.rglob("*.py")
+            if not SKIPPED_DIRS.intersection(path.parts)
+        }
+        resolved_root = root.resolve()
+        for key in self._staged:
+            staged = Path(key)
+            if staged.suffix != ".py" or staged in files:
+                continue
+            try:
+                rel = staged.relative_to(resolved_root)
+            except ValueError:
+                continue
+            if not SKIPPED_DIRS.intersection(rel.parts):
+                files[staged] = root / rel
+        return sorted(files.values())
+
+    def diff(self, root: str | Path | None = None) -> str:
+        """Unified diff of staged content against disk, with paths relative to ``root``.
+
+        ``root`` defaults to the working directory; files outside it keep their
+        absolute path.
+        """
+        base = Path(root or Path.cwd()).resolve()
+        chunks = []
+        for key, content in sorted(self._staged.items()):
+            path = Path(key)
+            try:
+                rel = path.relative_to(base).as_posix()
+                old_name, new_name = f"a/{rel}", f"b/{rel}"
+            except ValueError:
+                old_name = new_name = key
+            before = path.read_text(encoding="utf-8") if path.exists() else ""
+            chunks.extend(
+                difflib.unified_diff(
+                    before.splitlines(),
+                    content.splitlines(),
+                    fromfile=old_name if path.exists() else "/dev/null",
+                    tofile=new_name,
+                    lineterm="",
+                )
+            )
+        return "\n".join(chunks)
+
+    def discard(self) -> None:
+        self._staged.clear()
+
+    def flush(self, journal_path: str | None = None) -> dict[str, Any]:
+        staged = dict(self._staged)
+        originals = {
+            key: Path(key).read_text(encoding="utf-8") if Path(key).exists() else None
+            for key in staged
+        }
+        if journal_path:
+            _atomic_write(Path(journal_path), json.dumps(originals))
+
+        written: list[str] = []
+        try:
+            for key, content in staged.items():
+                _atomic_write(Path(key), content)
+                written.append(key)
+        except Exception as exc:  # noqa: BLE001 - any failure must leave the tree unpatched
+            _restore({key: originals[key] for key in written})
+            self._staged.clear()
+            return {"ok": False, "error": "flush_failed", "file_path": key, "message": str(exc)}
+
+        if journal_path:
+            Path(journal_path).unlink(missing_ok=True)
+        self._staged.clear()
+        return {"ok": True, "files_written": sorted(written)}
+
+
+def _restore(originals: dict[str, str | None]) -> None:
+    for key, content in originals.items():
+        if content is None:
+            Path(key).unlink(missing_ok=True)
+        else:
+            _atomic_write(Path(key), content)
+
+
+def rollback(journal_path: str) -> dict[str, Any]:
+    """Restore files recorded in a journal left behind by an interrupted flush."""
+    journal = Path(journal_path)
+    if not journal.exists():
+        return {"ok": False, "error": "journal_not_found", "journal_path": journal_path}
+    originals = json.loads(journal.read_text(encoding="utf-8"))
+    _restore(originals)
+    journal.unlink()
+    return {"ok": True, "files_restored": sorted(originals)}
+
+
+overlay = StagingOverlay()
+
 
 def read_file(file_path: str) -> dict[str, Any]:
-    path = Path(file_path)
-    if not path.exists():
+    if not overlay.exists(file_path):
         return {"ok": False, "error": "file_not_found", "file_path": file_path}
-    content = path.read_text(encoding="utf-8")
+    content = overlay.read_text(file_path)
     return {"ok": True, "file_path": file_path, "content": content}
 
 
 def write_file(file_path: str, content: str) -> dict[str, Any]:
-    path = Path(file_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
+    try:
+        encoded = content.encode("utf-8")
+    except UnicodeEncodeError as exc:
+        return {"ok": False, "error": "invalid_content", "file_path": file_path, "message": str(exc)}
+    overlay.stage(file_path, content)
     return {
         "ok": True,
         "file_path": file_path,
-        "bytes_written": len(content.encode("utf-8")),
+        "staged": True,
+        "bytes_written": len(encoded),
     }
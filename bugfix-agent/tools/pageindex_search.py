@@ -3,10 +3,14 @@ from __future__ import annotations
 import ast
 import hashlib
 import math
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from config import settings
+from tools.file_tools import overlay
+
 try:
     import chromadb
 except ModuleNotFoundError:  # pragma: no cover - fallback for restricted test environments
@@ -106,16 +110,22 @@ class PageIndexEngine:
         self.collection = self.client.get_or_create_collection(
             name="code_chunks", embedding_function=self.embedding_fn
         )
+        self.root: Path | None = None
+        self._file_ids: dict[str, list[str]] = {}
+        self.generation = 0
+        self.cache_size = settings.query_cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._query_cache: OrderedDict[tuple[str, int, int], list[dict[str, Any]]] = OrderedDict()
 
     def build(self, repo_root: str) -> dict[str, Any]:
         root = Path(repo_root)
+        self.root = root
         files_indexed = 0
         chunks: list[Chunk] = []
 
-        for path in root.rglob("*.py"):
-            if ".git" in path.parts or "__pycache__" in path.parts:
-                continue
-            text = path.read_text(encoding="utf-8")
+        for path in overlay.python_files(root):
+            text = overlay.read_text(path)
             chunks.extend(self._chunk_file(path, text, root))
             files_indexed += 1
 
@@ -124,27 +134,57 @@ class PageIndexEngine:
             if existing.get("ids"):
                 self.collection.delete(ids=existing["ids"])
 
-        if chunks:
-            ids = [f"{chunk.file_path}:{chunk.start_line}:{chunk.end_line}" for chunk in chunks]
-            docs = [f"{chunk.symbol}\n{chunk.content}" for chunk in chunks]
-            metadatas = [
-                {
-                    "file_path": chunk.file_path,
-                    "start_line": chunk.start_line,
-                    "end_line": chunk.end_line,
-                    "symbol": chunk.symbol,
-                }
-                for chunk in chunks
-            ]
-            self.collection.add(ids=ids, documents=docs, metadatas=metadatas)
-
+        self._file_ids.clear()
+        self._add_chunks(chunks)
+        self._invalidate()
         return {"ok": True, "files_indexed": files_indexed, "chunks": len(chunks)}
 
+    def update_file(self, file_path: str) -> dict[str, Any]:
+        """Re-chunk one file (e.g. after a staged edit) without rebuilding the index."""
+        if self.root is None:
+            return {"ok": False, "error": "index_not_built", "file_path": file_path}
+        path = Path(file_path)
+        if not path.is_absolute():
+            path = self.root / path
+        try:
+            rel = str(path.resolve().relative_to(self.root.resolve()))
+        except ValueError:
+            return {"ok": False, "error": "outside_index", "file_path": file_path}
+        stale = self._file_ids.pop(rel, [])
+        if stale:
+            self.collection.delete(ids=stale)
+        path = self.root / rel
+        chunks = self._chunk_file(path, overlay.read_text(path), self.root)
+        self._add_chunks(chunks)
+        self._invalidate()
+        return {"ok": True, "file_path": rel, "chunks": len(chunks)}
+
+    def _add_chunks(self, chunks: list[Chunk]) -> None:
+        if not chunks:
+            return
+        ids = [f"{chunk.file_path}:{chunk.start_line}:{chunk.end_line}" for chunk in chunks]
+        docs = [f"{chunk.symbol}\n{chunk.content}" for chunk in chunks]
+        metadatas = [
+            {
+                "file_path": chunk.file_path,
+                "start_line": chunk.start_line,
+                "end_line": chunk.end_line,
+                "symbol": chunk.symbol,
+            }
+            for chunk in chunks
+        ]
+        self.collection.add(ids=ids, documents=docs, metadatas=metadatas)
+        for row_id, chunk in zip(ids, chunks):
+            self._file_ids.setdefault(chunk.file_path, []).append(row_id)
+
     def _chunk_file(self, path: Path, text: str, root: Path) -> list[Chunk]:
         rel = str(path.relative_to(root))
         lines = text.splitlines()
         chunks: list[Chunk] = []
-        tree = ast.parse(text)
+        try:
+            tree = ast.parse(text)
+        except SyntaxError:
+            return [Chunk(rel, 1, len(lines), "<module>", text)]
         for node in tree.body:
             if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
                 start = node.lineno
@@ -157,8 +197,42 @@ class PageIndexEngine:
         return chunks
 
     def query(self, query: str, top_k: int = 5) -> dict[str, Any]:
+        """Search the index, serving repeats from an LRU keyed by index generation.
+
+        Queries are normalized the same way the embedding tokenizes them, so
+        case and whitespace variants share one cache entry.
+        """
+        key = (" ".join(query.lower().split()), top_k, self.generation)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            self._query_cache.move_to_end(key)
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            cached = self._search(query, top_k)
+            self._query_cache[key] = cached
+            if len(self._query_cache) > self.cache_size:
+                self._query_cache.popitem(last=False)
+        # Hand out copies so callers cannot mutate the cached hits.
+        results = [{**hit, "line_range": list(hit["line_range"])} for hit in cached]
+        return {"ok": True, "query": query, "results": results}
+
+    def cache_info(self) -> dict[str, int]:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._query_cache),
+            "maxsize": self.cache_size,
+            "generation": self.generation,
+        }
+
+    def _invalidate(self) -> None:
+        self.generation += 1
+        self._query_cache.clear()
+
+    def _search(self, query: str, top_k: int) -> list[dict[str, Any]]:
         if not self.collection.count():
-            return {"ok": True, "query": query, "results": []}
+            return []
 
         hits = self.collection.query(query_texts=[query], n_results=top_k)
         metadatas = hits.get("metadatas", [[]])[0]
@@ -173,9 +247,19 @@ class PageIndexEngine:
                     "line_range": [metadata["start_line"], metadata["end_line"]],
                     "symbol": metadata["symbol"],
                     "score": round(score, 4),
+                    "snippet": self._snippet(metadata),
                 }
             )
-        return {"ok": True, "query": query, "results": results}
+        return results
+
+    def _snippet(self, metadata: dict[str, Any]) -> str:
+        if self.root is None:
+            return ""
+        path = self.root / metadata["file_path"]
+        if not overlay.exists(path):
+            return ""
+        lines = overlay.read_text(path).splitlines()
+        return "\n".join(lines[metadata["start_line"] - 1 : metadata["end_line"]])
 
 
 pageindex = PageIndexEngine()
@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import ast
+from array import array
+from collections import Counter, deque
+from itertools import accumulate
+from pathlib import PurePosixPath
+from typing import Any
+
+CALL, REFERENCE, IMPORT, INSTANCE = 0, 1, 2, 3
+KIND_NAMES = ("call", "reference", "import", "instance")
+_EDGE_WIDTH = 5  # src, dst, kind, file, line
+
+
+def module_name(rel: str) -> str:
+    parts = list(PurePosixPath(rel.replace("\\", "/")).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def is_test_file(rel: str) -> bool:
+    path = PurePosixPath(rel.replace("\\", "/"))
+    return path.name.startswith("test_") or path.name.endswith("_test.py") or "tests" in path.parts
+
+
+class _ModuleVisitor(ast.NodeVisitor):
+    """Collects definitions and outgoing call/reference/import edges for one module."""
+
+    def __init__(self, module: str, is_package: bool) -> None:
+        self.module = module
+        self.package = module if is_package else module.rpartition(".")[0]
+        self.bindings: dict[str, str] = {}
+        self.definitions: list[tuple[str, int, bool]] = []
+        self.edges: list[tuple[str, str, int, int]] = []
+        self.scopes = [module]
+        self.receivers: list[dict[str, str]] = [{}]
+        self.in_class = [False]
+
+    def collect(self, tree: ast.Module) -> None:
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.bindings[node.name] = f"{self.module}.{node.name}"
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        self._bind(alias.asname, alias.name, node.lineno)
+                    else:
+                        head = alias.name.partition(".")[0]
+                        self.bindings[head] = head
+            elif isinstance(node, ast.ImportFrom):
+                base = self._absolute(node.module, node.level)
+                for alias in node.names:
+                    if alias.name != "*":
+                        target = f"{base}.{alias.name}" if base else alias.name
+                        self._bind(alias.asname or alias.name, target, node.lineno)
+        for node in tree.body:
+            # Module-level ``name = Cls(...)`` singletons: ``name.meth`` is ``Cls.meth``.
+            value = node.value if isinstance(node, (ast.Assign, ast.AnnAssign)) else None
+            cls = self._resolve(value.func) if isinstance(value, ast.Call) else None
+            if cls is None:
+                continue
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    instance = f"{self.module}.{target.id}"
+                    self.bindings[target.id] = instance
+                    self.edges.append((instance, cls, INSTANCE, node.lineno))
+        self.visit(tree)
+
+    def _absolute(self, module: str | None, level: int) -> str:
+        if not level:
+            return module or ""
+        parts = self.package.split(".") if self.package else []
+        parts = parts[: len(parts) - (level - 1)] if level > 1 else parts
+        if module:
+            parts.append(module)
+        return ".".join(parts)
+
+    def _bind(self, name: str, target: str, line: int) -> None:
+        self.bindings[name] = target
+        self.edges.append((f"{self.module}.{name}", target, IMPORT, line))
+
+    def _resolve(self, node: ast.expr) -> str | None:
+        if isinstance(node, ast.Name):
+            return self.receivers[-1].get(node.id) or self.bindings.get(node.id)
+        if isinstance(node, ast.Attribute):
+            base = self._resolve(node.value)
+            return f"{base}.{node.attr}" if base else None
+        return None
+
+    def _define(self, node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef) -> str:
+        qualname = f"{self.scopes[-1]}.{node.name}"
+        self.definitions.append((qualname, node.lineno, isinstance(node, ast.ClassDef)))
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        return qualname
+
+    def _visit_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        qualname = self._define(node)
+        receivers = dict(self.receivers[-1])
+        positional = node.args.posonlyargs + node.args.args
+        if self.in_class[-1] and positional:
+            receivers[positional[0].arg] = self.scopes[-1]
+        self.scopes.append(qualname)
+        self.receivers.append(receivers)
+        self.in_class.append(False)
+        for child in node.body:
+            self.visit(child)
+        self.in_class.pop()
+        self.receivers.pop()
+        self.scopes.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        qualname = self._define(node)
+        for base in node.bases:
+            self.visit(base)
+        self.scopes.append(qualname)
+        self.in_class.append(True)
+        for child in node.body:
+            self.visit(child)
+        self.in_class.pop()
+        self.scopes.pop()
+
+    def visit_Call(self, node: ast.Call) -> None:
+        target = self._resolve(node.func)
+        if target:
+            self.edges.append((self.scopes[-1], target, CALL, node.lineno))
+            if isinstance(node.func, ast.Attribute):
+                self._visit_receiver(node.func.value)
+        else:
+            self.visit(node.func)
+        for arg in node.args:
+            self.visit(arg)
+        for keyword in node.keywords:
+            self.visit(keyword)
+
+    def _visit_receiver(self, node: ast.expr) -> None:
+        # ``a.b.c()`` already recorded the full chain; only descend into calls or
+        # subscripts hidden inside the receiver, not its plain name prefixes.
+        while isinstance(node, ast.Attribute):
+            node = node.value
+        if not isinstance(node, ast.Name):
+            self.visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        target = self._resolve(node)
+        if target:
+            self.edges.append((self.scopes[-1], target, REFERENCE, node.lineno))
+            self._visit_receiver(node.value)
+        else:
+            self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if isinstance(node.ctx, ast.Load) and node.id in self.bindings:
+            self.edges.append((self.scopes[-1], self.bindings[node.id], REFERENCE, node.lineno))
+
+
+class SymbolIndex:
+    """Symbol-level definition and call/reference graph.
+
+    Names are interned to integer ids and edges live in flat ``array('I')``
+    buffers per file. Incoming edges are served from a reverse CSR adjacency
+    (``_offsets`` plus parallel ``_incoming_file``/``_incoming_pos`` arrays
+    pointing into those buffers) built by counting sort. Files re-indexed after
+    that build are masked out of the CSR and served from a small per-target
+    delta instead; the CSR is only rebuilt once the delta grows past a fraction
+    of the graph, so a single ``update_file`` keeps lookups in microseconds.
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self._names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._files: list[str] = []
+        self._file_ids: dict[str, int] = {}
+        self._definitions: dict[int, tuple[int, int]] = {}
+        self._classes: set[int] = set()
+        self._file_definitions: dict[int, array] = {}
+        self._file_edges: dict[int, array] = {}
+        self._offsets = array("I", [0])
+        self._incoming_file = array("I")
+        self._incoming_pos = array("I")
+        self._csr_edges = 0
+        self._stale: set[int] = set()
+        self._delta: dict[int, list[tuple[int, int]]] = {}
+        self._delta_edges = 0
+
+    def _intern(self, name: str) -> int:
+        symbol_id = self._ids.get(name)
+        if symbol_id is None:
+            symbol_id = len(self._names)
+            self._names.append(name)
+            self._ids[name] = symbol_id
+        return symbol_id
+
+    def _file_id(self, rel: str) -> int:
+        file_id = self._file_ids.get(rel)
+        if file_id is None:
+            file_id = len(self._files)
+            self._files.append(rel)
+            self._file_ids[rel] = file_id
+        return file_id
+
+    def _drop_file(self, file_id: int) -> None:
+        for symbol_id in self._file_definitions.pop(file_id, array("I")):
+            self._definitions.pop(symbol_id, None)
+            self._classes.discard(symbol_id)
+        old_edges = self._file_edges.pop(file_id, None)
+        if old_edges is None:
+            return
+        if file_id in self._stale:
+            # Its current edges live in the delta, not the CSR.
+            for target in set(old_edges[1::_EDGE_WIDTH]):
+                kept = [entry for entry in self._delta.get(target, []) if entry[0] != file_id]
+                self._delta_edges -= len(self._delta.get(target, [])) - len(kept)
+                if kept:
+                    self._delta[target] = kept
+                else:
+                    self._delta.pop(target, None)
+        self._stale.add(file_id)
+
+    def remove_module(self, rel: str) -> None:
+        file_id = self._file_ids.get(rel)
+        if file_id is not None:
+            self._drop_file(file_id)
+
+    def index_module(self, rel: str, tree: ast.Module) -> None:
+        file_id = self._file_id(rel)
+        self._drop_file(file_id)
+
+        module = module_name(rel)
+        visitor = _ModuleVisitor(module, rel.endswith("__init__.py"))
+        visitor.collect(tree)
+
+        definitions = array("I")
+        for qualname, line, is_class in [(module, 1, False), *visitor.definitions]:
+            symbol_id = self._intern(qualname)
+            self._definitions[symbol_id] = (file_id, line)
+            if is_class:
+                self._classes.add(symbol_id)
+            definitions.append(symbol_id)
+        self._file_definitions[file_id] = definitions
+
+        edges = array("I")
+        for source, target, kind, line in visitor.edges:
+            edges.extend((self._intern(source), self._intern(target), kind, file_id, line))
+        self._file_edges[file_id] = edges
+        for pos in range(0, len(edges), _EDGE_WIDTH):
+            self._delta.setdefault(edges[pos + 1], []).append((file_id, pos))
+        self._delta_edges += len(edges) // _EDGE_WIDTH
+        self._stale.add(file_id)
+
+    def _rebuild(self) -> None:
+        """Counting-sort every file's edges by target into a fresh CSR."""
+        degree = [0] * (len(self._names) + 1)
+        for edges in self._file_edges.values():
+            for target, count in Counter(edges[1::_EDGE_WIDTH]).items():
+                degree[target + 1] += count
+        offsets = list(accumulate(degree))
+        total = offsets[-1]
+        incoming_file = array("I", [0]) * total
+        incoming_pos = array("I", incoming_file)
+        cursor = offsets[:-1]
+        for file_id, edges in self._file_edges.items():
+            for pos in range(0, len(edges), _EDGE_WIDTH):
+                target = edges[pos + 1]
+                slot = cursor[target]
+                cursor[target] = slot + 1
+                incoming_file[slot] = file_id
+                incoming_pos[slot] = pos
+        self._offsets = array("I", offsets)
+        self._incoming_file = incoming_file
+        self._incoming_pos = incoming_pos
+        self._csr_edges = total
+        self._stale.clear()
+        self._delta.clear()
+        self._delta_edges = 0
+
+    def _incoming_edges(self, symbol_id: int) -> list[tuple[int, ...]]:
+        if self._delta_edges > max(4096, self._csr_edges // 4):
+            self._rebuild()
+        rows = []
+        if symbol_id + 1 < len(self._offsets):
+            for slot in range(self._offsets[symbol_id], self._offsets[symbol_id + 1]):
+                file_id = self._incoming_file[slot]
+                if file_id not in self._stale:
+                    pos = self._incoming_pos[slot]
+                    rows.append(tuple(self._file_edges[file_id][pos : pos + _EDGE_WIDTH]))
+        for file_id, pos in self._delta.get(symbol_id, ()):
+            rows.append(tuple(self._file_edges[file_id][pos : pos + _EDGE_WIDTH]))
+        return rows
+
+    def _aliases(self, symbol_id: int) -> list[int]:
+        """The symbol plus every import binding that re-exports it.
+
+        For a method, calls through an instance of its class (``graph.update``
+        for ``graph = DependencyGraph()``) are aliases of the method too.
+        """
+        queue = deque([symbol_id, *self._instance_members(symbol_id)])
+        seen = set(queue)
+        while queue:
+            for source, _, kind, _, _ in self._incoming_edges(queue.popleft()):
+                if kind in (IMPORT, INSTANCE) and source not in seen:
+                    seen.add(source)
+                    queue.append(source)
+        return sorted(seen)
+
+    def _instance_members(self, symbol_id: int) -> list[int]:
+        """``instance.attr`` symbols for ``Class.attr``, one per instance binding."""
+        owner, _, attr = self._names[symbol_id].rpartition(".")
+        owner_id = self._ids.get(owner)
+        if owner_id not in self._classes:
+            return []
+        members = []
+        for alias in self._aliases(owner_id):
+            member = self._ids.get(f"{self._names[alias]}.{attr}")
+            if alias != owner_id and member is not None:
+                members.append(member)
+        return members
+
+    def _row(self, source: int, kind: int, file_id: int, line: int) -> dict[str, Any]:
+        return {
+            "symbol": self._names[source],
+            "kind": KIND_NAMES[kind],
+            "file_path": self._files[file_id],
+            "line": line,
+        }
+
+    def definition(self, symbol: str) -> dict[str, Any] | None:
+        symbol_id = self._ids.get(symbol)
+        site = self._definitions.get(symbol_id) if symbol_id is not None else None
+        if site is None:
+            return None
+        return {"symbol": symbol, "file_path": self._files[site[0]], "line": site[1]}
+
+    def references(self, symbol: str, kinds: tuple[str, ...] = ("call", "reference")) -> list[dict[str, Any]]:
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            return []
+        wanted = {KIND_NAMES.index(kind) for kind in kinds}
+        rows = []
+        for alias in self._aliases(symbol_id):
+            for source, _, kind, file_id, line in self._incoming_edges(alias):
+                if kind in wanted:
+                    rows.append(self._row(source, kind, file_id, line))
+        return rows
+
+    def callers(self, symbol: str) -> list[dict[str, Any]]:
+        return self.references(symbol, kinds=("call",))
+
+    def tests_reaching(self, symbol: str) -> list[str]:
+        """Test functions that transitively call or reference ``symbol``.
+
+        Method calls on instances cannot be resolved statically, so reaching a
+        method's class (e.g. by constructing it) counts as reaching the method.
+        """
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            return []
+        seen = {symbol_id}
+        queue = deque([symbol_id])
+        tests: set[str] = set()
+        while queue:
+            current = queue.popleft()
+            owner = self._ids.get(self._names[current].rpartition(".")[0])
+            if owner in self._classes and owner not in seen:
+                seen.add(owner)
+                queue.append(owner)
+                for member in self._instance_members(current):
+                    if member not in seen:
+                        seen.add(member)
+                        queue.append(member)
+            for source, _, _, file_id, _ in self._incoming_edges(current):
+                if source in seen:
+                    continue
+                seen.add(source)
+                queue.append(source)
+                name = self._names[source]
+                if is_test_file(self._files[file_id]) and name.rpartition(".")[2].startswith("test"):
+                    tests.add(name)
+        return sorted(tests)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "symbols": len(self._names),
+            "definitions": len(self._definitions),
+            "edges": sum(len(edges) for edges in self._file_edges.values()) // _EDGE_WIDTH,
+        }
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from tools.file_tools import write_file
+
+HAS_GIT = shutil.which("git") is not None
+HAS_FICLONE = importlib.util.find_spec("fcntl") is not None
+if HAS_FICLONE:
+    fcntl = importlib.import_module("fcntl")
+
+# ioctl(2) request for a copy-on-write clone (btrfs, XFS, bcachefs).
+FICLONE = 0x40049409
+IGNORED_DIRS = (".git", "__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".venv", "venv")
+
+
+@dataclass(slots=True)
+class Workspace:
+    """Scratch copy of a repository used to try out one candidate plan.
+
+    A ``worktree`` workspace is a detached ``git worktree`` with the source tree's
+    uncommitted changes replayed onto it; a ``copy`` workspace is a file-by-file
+    copy (reflinked where the filesystem supports it). Neither shares inodes
+    with the source tree, so verification commands may write anywhere inside it.
+    """
+
+    source: Path
+    root: Path
+    kind: str
+
+    def relative(self, file_path: str) -> str:
+        """Map ``file_path`` into the repo; raise ``ValueError`` if it points outside."""
+        path = Path(file_path)
+        if not path.is_absolute():
+            path = self.source / path
+        return str(path.resolve().relative_to(self.source))
+
+    def resolve(self, file_path: str) -> Path:
+        return self.root / self.relative(file_path)
+
+    def write_file(self, file_path: str, content: str) -> dict[str, Any]:
+        return write_file(str(self.resolve(file_path)), content)
+
+    def cleanup(self) -> None:
+        if self.kind == "worktree":
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", str(self.root)],
+                cwd=self.source,
+                capture_output=True,
+            )
+        shutil.rmtree(self.root.parent, ignore_errors=True)
+
+
+def _git(root: Path, *args: str, stdin: bytes | None = None) -> subprocess.CompletedProcess[bytes]:
+    return subprocess.run(["git", *args], cwd=root, input=stdin, capture_output=True)
+
+
+def _create_worktree(source: Path, root: Path) -> bool:
+    if not HAS_GIT or not (source / ".git").exists():
+        return False
+    if _git(source, "worktree", "add", "--detach", str(root)).returncode != 0:
+        return False
+
+    pending = _git(source, "diff", "--binary", "HEAD")
+    untracked = _git(source, "ls-files", "--others", "--exclude-standard", "-z")
+    applied = pending.returncode == 0 and untracked.returncode == 0
+    if applied and pending.stdout:
+        applied = _git(root, "apply", "--binary", "-", stdin=pending.stdout).returncode == 0
+    if not applied:
+        _git(source, "worktree", "remove", "--force", str(root))
+        return False
+    for rel in filter(None, untracked.stdout.decode("utf-8").split("\0")):
+        target = root / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _reflink_or_copy(str(source / rel), str(target))
+    return True
+
+
+def _reflink_or_copy(src: str, dst: str) -> None:
+    if HAS_FICLONE:
+        try:
+            with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def create_workspace(repo_root: str) -> Workspace:
+    source = Path(repo_root).resolve()
+    # Sibling of the repo so reflinks stay on the same filesystem.
+    parent = Path(tempfile.mkdtemp(prefix=f".{source.name}-ws-", dir=source.parent))
+    root = parent / source.name
+
+    if _create_worktree(source, root):
+        return Workspace(source=source, root=root, kind="worktree")
+
+    shutil.copytree(
+        source,
+        root,
+        copy_function=_reflink_or_copy,
+        ignore=shutil.ignore_patterns(*IGNORED_DIRS),
+    )
+    return Workspace(source=source, root=root, kind="copy")